@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#  Copyright 2013-2014 Nokia Solutions and Networks
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+"""Times DbBotReader queries on a synthetic SQLite database.
+
+python benchmarks/reader_benchmark.py --runs 200 --keywords 10000 --tests 1000
+
+The defaults create 2M keyword_status and 200k test_status rows. Every query
+is timed on its first page and on a deep page, with and without result cache.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from random import Random
+from time import perf_counter
+
+sys.path.append(os.path.abspath(__file__ + '/../..'))
+from loguru import logger
+
+from dbbot.reader import DatabaseWriter, DbBotReader
+
+KEYWORD_NAMES = 500
+
+
+def build_database(path, runs, tests, keywords):
+    DatabaseWriter('sqlite:///%s' % path).close()
+    random = Random(0)
+    started = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        'INSERT INTO test_runs (id, hash, imported_at, source_file) VALUES (?, ?, ?, ?)',
+        ((run, 'hash-%d' % run, started + timedelta(hours=run), 'output-%d.xml' % run) for run in range(1, runs + 1)))
+    connection.executemany(
+        "INSERT INTO test_run_status (test_run_id, name, passed, failed) VALUES (?, 'All Tests', ?, ?)",
+        ((run, tests - run % 7, run % 7) for run in range(1, runs + 1)))
+    connection.executemany(
+        "INSERT INTO suites (id, test_run_id, xml_id, name, source) VALUES (?, ?, 's1', 'Suite', 'suite.robot')",
+        ((run, run) for run in range(1, runs + 1)))
+    connection.executemany(
+        "INSERT INTO tests (id, suite_id, xml_id, name) VALUES (?, ?, 's1-t1', ?)",
+        (((run - 1) * tests + test, run, 'Test %d' % test) for run in range(1, runs + 1) for test in range(1, tests + 1)))
+    connection.executemany(
+        'INSERT INTO test_status (test_run_id, test_id, status, elapsed) VALUES (?, ?, ?, ?)',
+        ((run, (run - 1) * tests + test, 'FAIL' if random.random() < 0.05 else 'PASS', random.randint(1, 5000))
+         for run in range(1, runs + 1) for test in range(1, tests + 1)))
+    connection.executemany(
+        "INSERT INTO keywords (id, suite_id, keyword_xml_id, name, type) VALUES (?, 1, ?, ?, 'KEYWORD')",
+        ((keyword, 'k%d' % keyword, 'Keyword %d' % (keyword % KEYWORD_NAMES)) for keyword in range(1, keywords + 1)))
+    connection.executemany(
+        "INSERT INTO keyword_status (test_run_id, keyword_id, status, elapsed) VALUES (?, ?, 'PASS', ?)",
+        ((run, keyword, random.randint(1, 1000)) for run in range(1, runs + 1) for keyword in range(1, keywords + 1)))
+    connection.executemany(
+        "INSERT INTO messages (suite_id, keyword_id, level, timestamp, time_string, content, content_hash)"
+        " VALUES (?, ?, 'FAIL', ?, '', ?, ?)",
+        ((run, message, started, 'failure %d' % message, '%d-%d' % (run, message))
+         for run in range(1, runs + 1) for message in range(1, 101)))
+    connection.commit()
+    connection.close()
+
+
+def deep_key(query, depth, **kwargs):
+    page = query(**kwargs)
+    for _ in range(depth - 1):
+        page = query(after=page.next_key, **kwargs)
+    return page.next_key
+
+
+def timed(function, repeat):
+    function()
+    start = perf_counter()
+    for _ in range(repeat):
+        function()
+    return (perf_counter() - start) / repeat * 1000
+
+
+def benchmark(db_url, runs, repeat):
+    test_run_id = runs // 2
+    queries = [
+        ('run_summaries', {'limit': 10}),
+        ('test_history', {'test_name': 'Test 1', 'limit': 10}),
+        ('failure_messages', {'test_run_id': test_run_id, 'limit': 10}),
+        ('keyword_timings', {'test_run_id': test_run_id, 'limit': 20}),
+    ]
+    print('%-18s %12s %12s %12s %12s' % ('query (ms)', 'first', 'deep', 'first cached', 'deep cached'))
+    for query_name, kwargs in queries:
+        timings = []
+        for cache_size in (0, 64):
+            reader = DbBotReader(db_url, cache_size=cache_size)
+            query = getattr(reader, query_name)
+            after = deep_key(query, 8, **kwargs)
+            timings.append(timed(lambda: query(**kwargs), repeat))
+            timings.append(timed(lambda: query(after=after, **kwargs), repeat))
+            reader.close()
+        print('%-18s %12.2f %12.2f %12.2f %12.2f' % (query_name, timings[0], timings[1], timings[2], timings[3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLite file to create, a temporary one by default')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--tests', type=int, default=1000, help='tests per run')
+    parser.add_argument('--keywords', type=int, default=10000, help='keyword executions per run')
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+    logger.remove()
+    directory = tempfile.TemporaryDirectory()
+    path = options.database or os.path.join(directory.name, 'benchmark.db')
+    if os.path.exists(path):
+        os.remove(path)
+    start = perf_counter()
+    build_database(path, options.runs, options.tests, options.keywords)
+    print('Built %s with %d keyword_status and %d test_status rows in %.1fs' % (
+        path, options.runs * options.keywords, options.runs * options.tests, perf_counter() - start))
+    benchmark('sqlite:///%s' % path, options.runs, options.repeat)
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,4 +14,6 @@
 
 __version__ = '4.1.0'
 
+from dbbot.reader import (DbBotReader, ShardedDbBotReader, ShardRouter,
+                          by_date, by_project, by_source)
 from dbbot.run import DbBot
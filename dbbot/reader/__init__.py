@@ -11,5 +11,7 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
+from .database_reader import DbBotReader, ShardedDbBotReader
 from .database_writer import DatabaseWriter
 from .robot_results_parser import RobotResultsParser
+from .shard_router import ShardRouter, by_date, by_project, by_source
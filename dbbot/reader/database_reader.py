@@ -0,0 +1,373 @@
+#  Copyright 2013-2014 Nokia Solutions and Networks
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+import os
+from collections import OrderedDict
+from datetime import datetime
+from heapq import merge
+from time import monotonic
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import MetaData, Table, create_engine, func, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import and_, bindparam, or_, select
+
+TOTAL_STATISTICS_NAME = 'All Tests'
+
+
+class RunSummary(NamedTuple):
+    id: int
+    hash: str
+    source_file: Optional[str]
+    imported_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    passed: Optional[int]
+    failed: Optional[int]
+
+
+class TestHistoryEntry(NamedTuple):
+    id: int
+    test_run_id: int
+    started_at: Optional[datetime]
+    suite_name: str
+    test_name: str
+    status: str
+    elapsed: int
+
+
+class FailureMessage(NamedTuple):
+    id: int
+    suite_id: Optional[int]
+    test_id: Optional[int]
+    keyword_id: int
+    timestamp: datetime
+    content: str
+
+
+class KeywordTiming(NamedTuple):
+    name: str
+    type: str
+    calls: int
+    total_elapsed: int
+    max_elapsed: int
+
+    @property
+    def average_elapsed(self):
+        return self.total_elapsed / self.calls if self.calls else 0
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_key: Any
+
+
+class ShardRecord(NamedTuple):
+    shard: str
+    record: Any
+
+
+def _check_limit(limit):
+    if limit < 1:
+        raise ValueError('Page limit has to be at least 1, got %s' % limit)
+
+
+class DbBotReader(object):
+
+    def __init__(self, db_url: str, *, cache_size: int = 0, cache_ttl: Optional[float] = None):
+        """Typed, read-only queries over a database populated by DbBot.
+        reader = DbBotReader(uri, cache_size=256, cache_ttl=60)
+
+        Every query returns a Page; pass its next_key back as `after` to get
+        the following page. Pages are keyset paginated, so fetching a deep
+        page costs the same as fetching the first one.
+
+        Args:
+            db_url (str): connection string to dbbot database
+            cache_size (int, optional): how many query results to keep in memory. Defaults to 0 (no caching).
+            cache_ttl (float, optional): seconds a cached result stays valid. Defaults to None (until new results are written).
+        """
+        self._engine = create_engine(db_url)
+        # Without autocommit the first SELECT opens a transaction that is never
+        # ended, and on snapshot isolation databases new imports stay invisible.
+        self._connection = self._engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        self._metadata = MetaData()
+        self._statements = {}
+        self._cache = _ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self._init_schema()
+
+    def __log(self, message):
+        logger.info(f"Database Reader {message}")
+
+    TABLES = ('test_runs', 'test_run_status', 'suites', 'tests', 'test_status',
+              'keywords', 'keyword_status', 'messages')
+
+    def _init_schema(self):
+        self.__log('- Reflecting database schema')
+        for table_name in self.TABLES:
+            setattr(self, table_name, Table(table_name, self._metadata, autoload_with=self._engine))
+
+    def run_summaries(self, limit: int = 50, after: Optional[Tuple[datetime, int]] = None) -> Page:
+        """Test runs with their total pass/fail counts, newest import first."""
+        _check_limit(limit)
+        after_imported_at, after_id = after if after is not None else (None, None)
+        rows = self._fetch('run_summaries', after is not None, limit=limit,
+                           after_imported_at=after_imported_at, after_id=after_id)
+        items = [RunSummary(*row) for row in rows]
+        last = items[-1] if len(items) == limit else None
+        return Page(items, (last.imported_at, last.id) if last else None)
+
+    def test_history(self, test_name: str, suite_name: Optional[str] = None,
+                     limit: int = 50, after: Optional[int] = None) -> Page:
+        """Status and elapsed time of a test across all runs, newest first."""
+        _check_limit(limit)
+        rows = self._fetch('test_history' if suite_name is None else 'test_history_in_suite', after is not None,
+                           test_name=test_name, suite_name=suite_name, limit=limit, after=after)
+        items = [TestHistoryEntry(*row) for row in rows]
+        return Page(items, items[-1].id if len(items) == limit else None)
+
+    def failure_messages(self, test_run_id: int, limit: int = 100, after: Optional[int] = None) -> Page:
+        """FAIL level messages logged by keywords of a test run, in logging order."""
+        _check_limit(limit)
+        rows = self._fetch('failure_messages', after is not None, test_run_id=test_run_id, limit=limit, after=after)
+        items = [FailureMessage(*row) for row in rows]
+        return Page(items, items[-1].id if len(items) == limit else None)
+
+    def keyword_timings(self, test_run_id: int, limit: int = 50,
+                        after: Optional[Tuple[int, str, str]] = None) -> Page:
+        """Keywords of a test run aggregated by name and type, slowest first."""
+        _check_limit(limit)
+        after_total, after_name, after_type = after if after is not None else (None, None, None)
+        rows = self._fetch('keyword_timings', after is not None, test_run_id=test_run_id, limit=limit,
+                           after_total=after_total, after_name=after_name, after_type=after_type)
+        items = [KeywordTiming(*row) for row in rows]
+        last = items[-1] if len(items) == limit else None
+        return Page(items, (last.total_elapsed, last.name, last.type) if last else None)
+
+    def _fetch(self, query_name, paginated, **params):
+        if self._cache is None:
+            return self._execute(query_name, paginated, params)
+        self._cache.validate(self._data_version())
+        key = (query_name, tuple(sorted(params.items())))
+        rows = self._cache.get(key)
+        if rows is None:
+            rows = self._execute(query_name, paginated, params)
+            self._cache.put(key, rows)
+        return rows
+
+    def _execute(self, query_name, paginated, params):
+        return [tuple(row) for row in self._connection.execute(self._statement(query_name, paginated), params)]
+
+    def _data_version(self):
+        return tuple(self._connection.execute(self._statement('data_version', False)).first())
+
+    def _statement(self, query_name, paginated):
+        # Statements are built once per shape and reused with bound parameters,
+        # so SQLAlchemy's compiled cache is hit on every subsequent call.
+        key = (query_name, paginated)
+        if key not in self._statements:
+            self._statements[key] = getattr(self, '_build_' + query_name)(paginated)
+        return self._statements[key]
+
+    def _build_data_version(self, paginated):
+        # An import inserts rows one at a time into several tables, so the
+        # highest id of every table read changes with each of its inserts.
+        return select([
+            select([func.max(getattr(self, table_name).c.id)]).scalar_subquery()
+            for table_name in self.TABLES
+        ])
+
+    def _build_run_summaries(self, paginated):
+        runs, status = self.test_runs, self.test_run_status
+        sql_statement = select([
+            runs.c.id, runs.c.hash, runs.c.source_file, runs.c.imported_at,
+            runs.c.started_at, runs.c.finished_at, status.c.passed, status.c.failed
+        ]).select_from(
+            runs.outerjoin(status, and_(status.c.test_run_id == runs.c.id,
+                                        status.c.name == TOTAL_STATISTICS_NAME))
+        )
+        if paginated:
+            after_imported_at = bindparam('after_imported_at', type_=runs.c.imported_at.type)
+            sql_statement = sql_statement.where(or_(
+                runs.c.imported_at < after_imported_at,
+                and_(runs.c.imported_at == after_imported_at, runs.c.id < bindparam('after_id'))
+            ))
+        return sql_statement.order_by(runs.c.imported_at.desc(), runs.c.id.desc()).limit(bindparam('limit'))
+
+    def _build_test_history(self, paginated, in_suite=False):
+        runs, suites, tests, status = self.test_runs, self.suites, self.tests, self.test_status
+        sql_statement = select([
+            status.c.id, status.c.test_run_id, runs.c.started_at,
+            suites.c.name, tests.c.name, status.c.status, status.c.elapsed
+        ]).select_from(
+            status.join(tests, tests.c.id == status.c.test_id)
+                  .join(suites, suites.c.id == tests.c.suite_id)
+                  .join(runs, runs.c.id == status.c.test_run_id)
+        ).where(tests.c.name == bindparam('test_name'))
+        if in_suite:
+            sql_statement = sql_statement.where(suites.c.name == bindparam('suite_name'))
+        if paginated:
+            sql_statement = sql_statement.where(status.c.id < bindparam('after'))
+        return sql_statement.order_by(status.c.id.desc()).limit(bindparam('limit'))
+
+    def _build_test_history_in_suite(self, paginated):
+        return self._build_test_history(paginated, in_suite=True)
+
+    def _build_failure_messages(self, paginated):
+        messages, suites = self.messages, self.suites
+        sql_statement = select([
+            messages.c.id, messages.c.suite_id, messages.c.test_id,
+            messages.c.keyword_id, messages.c.timestamp, messages.c.content
+        ]).select_from(
+            messages.join(suites, suites.c.id == messages.c.suite_id)
+        ).where(and_(suites.c.test_run_id == bindparam('test_run_id'), messages.c.level == 'FAIL'))
+        if paginated:
+            sql_statement = sql_statement.where(messages.c.id > bindparam('after'))
+        return sql_statement.order_by(messages.c.id).limit(bindparam('limit'))
+
+    def _build_keyword_timings(self, paginated):
+        keywords, status = self.keywords, self.keyword_status
+        total_elapsed = func.sum(status.c.elapsed)
+        sql_statement = select([
+            keywords.c.name, keywords.c.type, func.count(status.c.id), total_elapsed, func.max(status.c.elapsed)
+        ]).select_from(
+            status.join(keywords, keywords.c.id == status.c.keyword_id)
+        ).where(status.c.test_run_id == bindparam('test_run_id')).group_by(keywords.c.name, keywords.c.type)
+        if paginated:
+            after_total = bindparam('after_total')
+            after_name = bindparam('after_name')
+            sql_statement = sql_statement.having(or_(
+                total_elapsed < after_total,
+                and_(total_elapsed == after_total, keywords.c.name > after_name),
+                and_(total_elapsed == after_total, keywords.c.name == after_name,
+                     keywords.c.type > bindparam('after_type'))
+            ))
+        return sql_statement.order_by(
+            total_elapsed.desc(), keywords.c.name, keywords.c.type
+        ).limit(bindparam('limit'))
+
+    def close(self):
+        self.__log('- Closing database connection')
+        self._connection.close()
+
+
+class ShardedDbBotReader(object):
+
+    def __init__(self, shards: Dict[str, str], **reader_options):
+        """Fans run-level queries out to every shard and merges the results.
+        reader = ShardedDbBotReader(router.shards, cache_size=256)
+
+        Queries taking a test_run_id are shard local, use reader(shard) for those.
+        Shards nothing has been imported to yet are read as empty.
+
+        Args:
+            shards (dict): shard name -> connection string to dbbot database
+            reader_options: passed on to the DbBotReader of each shard
+        """
+        self._shards = dict(shards)
+        self._reader_options = reader_options
+        self._readers = {}
+
+    def reader(self, shard: str) -> DbBotReader:
+        reader = self._reader(shard)
+        if reader is None:
+            raise ValueError('Shard %s has no DbBot results yet' % shard)
+        return reader
+
+    def _reader(self, shard):
+        if shard not in self._readers and _has_schema(self._shards[shard]):
+            self._readers[shard] = DbBotReader(self._shards[shard], **self._reader_options)
+        return self._readers.get(shard)
+
+    def run_summaries(self, limit: int = 50,
+                      after: Optional[Dict[str, Optional[Tuple[datetime, int]]]] = None) -> Page:
+        """Test runs of all shards with their total pass/fail counts, newest import first.
+
+        The next_key maps each shard that still has runs left to its own
+        keyset position, so every page reads at most `limit` runs per shard.
+        """
+        _check_limit(limit)
+        positions = dict.fromkeys(self._shards) if after is None else after
+        unknown = set(positions) - set(self._shards)
+        if unknown:
+            raise ValueError('Unknown shards in after: %s' % ', '.join(sorted(unknown)))
+        pages = {}
+        for shard, position in positions.items():
+            reader = self._reader(shard)
+            pages[shard] = reader.run_summaries(limit, position) if reader else Page([], None)
+        merged = merge(*([ShardRecord(shard, run) for run in page.items] for shard, page in pages.items()),
+                       key=lambda item: (item.record.imported_at, item.record.id, item.shard), reverse=True)
+        items = [item for _, item in zip(range(limit), merged)]
+        next_key = {}
+        for shard, page in pages.items():
+            taken = [(item.record.imported_at, item.record.id) for item in items if item.shard == shard]
+            if len(taken) < len(page.items):
+                next_key[shard] = taken[-1] if taken else positions[shard]
+            elif page.next_key is not None:
+                next_key[shard] = page.next_key
+        return Page(items, next_key or None)
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+
+
+def _has_schema(db_url):
+    url = make_url(db_url)
+    # Connecting would create a missing SQLite file, so check it exists first.
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+            and not os.path.exists(url.database):
+        return False
+    engine = create_engine(url)
+    try:
+        return inspect(engine).has_table('test_runs')
+    finally:
+        engine.dispose()
+
+
+class _ResultCache(object):
+    """LRU cache of query results, optionally expiring after `ttl` seconds.
+
+    All entries are dropped as soon as any new row shows up in the tables
+    read, since a cached result may be missing its data. This includes
+    results cached in the middle of an import.
+    """
+
+    def __init__(self, size, ttl=None):
+        self._size = size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._data_version = None
+
+    def validate(self, data_version):
+        if data_version != self._data_version:
+            self._entries.clear()
+            self._data_version = data_version
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self._ttl is not None and monotonic() - stored_at > self._ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
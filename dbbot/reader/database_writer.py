@@ -12,9 +12,9 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 from loguru import logger
-from sqlalchemy import (Column, DateTime, ForeignKey, Integer, MetaData,
-                        Sequence, String, Table, Text, UniqueConstraint,
-                        create_engine)
+from sqlalchemy import (Column, DateTime, ForeignKey, Index, Integer,
+                        MetaData, Sequence, String, Table, Text,
+                        UniqueConstraint, create_engine)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import and_, select
 
@@ -46,6 +46,14 @@ class DatabaseWriter(object):
         self.tags = self._create_table_tags()
         self.arguments = self._create_table_arguments()
         self._metadata.create_all(bind=self._engine)
+        self._create_indexes()
+
+    def _create_indexes(self):
+        # create_all skips tables that already exist, so databases created by
+        # older versions would otherwise never get indexes added later.
+        for table in self._metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self._engine, checkfirst=True)
 
     def _create_table_test_runs(self):
         return self._create_table('test_runs', (
@@ -54,7 +62,7 @@ class DatabaseWriter(object):
             Column('source_file', String(255)),
             Column('started_at', DateTime),
             Column('finished_at', DateTime)
-        ), ('hash',))
+        ), ('hash',), (('imported_at', 'id'),))
 
     def _create_table_test_run_status(self):
         return self._create_table('test_run_status', (
@@ -111,7 +119,7 @@ class DatabaseWriter(object):
             Column('name', String(255), nullable=False),
             Column('timeout', String(64)),
             Column('doc', Text)
-        ), ('suite_id', 'xml_id', 'name'))
+        ), ('suite_id', 'xml_id', 'name'), (('name',),))
 
     def _create_table_test_status(self):
         return self._create_table('test_status', (
@@ -119,7 +127,7 @@ class DatabaseWriter(object):
             Column('test_id', Integer, ForeignKey('tests.id'), nullable=False),
             Column('status', String(10), nullable=False),
             Column('elapsed', Integer, nullable=False)
-        ), ('test_run_id', 'test_id'))
+        ), ('test_run_id', 'test_id'), (('test_id',),))
 
     def _create_table_keywords(self):
         return self._create_table('keywords', (
@@ -138,7 +146,7 @@ class DatabaseWriter(object):
             Column('keyword_id', Integer, ForeignKey('keywords.id'), nullable=False),
             Column('status', String(10), nullable=False),
             Column('elapsed', Integer, nullable=False)
-        ))
+        ), indexes=(('test_run_id', 'keyword_id'),))
 
     def _create_table_messages(self):
         return self._create_table('messages', (
@@ -168,11 +176,14 @@ class DatabaseWriter(object):
             Column('content_hash', String(64), nullable=False)
         ), ('suite_id', 'keyword_id', 'position', 'content_hash'))
 
-    def _create_table(self, table_name, columns, unique_columns=()):
+    def _create_table(self, table_name, columns, unique_columns=(), indexes=()):
         args = [Column('id', Integer, Sequence('{table}_id_seq'.format(table=table_name)), primary_key=True)]
         args.extend(columns)
         if unique_columns:
             args.append(UniqueConstraint(*unique_columns, name='unique_{table}'.format(table=table_name)))
+        for index_columns in indexes:
+            args.append(Index('ix_{table}_{columns}'.format(table=table_name, columns='_'.join(index_columns)),
+                              *index_columns))
         return Table(table_name, self._metadata, *args)
 
     def fetch_id(self, table_name, criteria):
@@ -0,0 +1,154 @@
+#  Copyright 2013-2014 Nokia Solutions and Networks
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from fnmatch import fnmatch
+from functools import cached_property
+from typing import Callable, Dict, Optional
+from xml.etree.ElementTree import ParseError, iterparse
+
+from loguru import logger
+from robot.errors import DataError
+
+from .database_writer import DatabaseWriter
+
+
+class RouteKey(object):
+    """What routing rules route on. generated_at is read from the output xml
+    only when a rule asks for it."""
+
+    def __init__(self, project: Optional[str], source: str):
+        self.project = project
+        self.source = source
+
+    def __repr__(self):
+        return 'RouteKey(project=%r, source=%r)' % (self.project, self.source)
+
+    @cached_property
+    def generated_at(self) -> Optional[datetime]:
+        try:
+            with open(self.source, 'rb') as f:
+                _, root = next(iterparse(f, events=('start',)))
+            generated = root.get('generated')
+            if not generated:
+                return None
+            try:
+                return datetime.strptime(generated, '%Y%m%d %H:%M:%S.%f')
+            except ValueError:
+                return datetime.fromisoformat(generated)
+        except (OSError, ParseError, StopIteration, ValueError) as error:
+            raise DataError("Reading XML source '%s' failed: %s" % (self.source, error))
+
+
+def by_project(mapping: Optional[Dict[str, str]] = None):
+    """Route by project name, either directly or through a project -> shard mapping."""
+    return lambda key: key.project if mapping is None else mapping.get(key.project)
+
+
+def by_source(patterns: Dict[str, str]):
+    """Route to the shard of the first glob pattern matching the output xml path."""
+    return lambda key: next((shard for pattern, shard in patterns.items() if fnmatch(key.source, pattern)), None)
+
+
+def by_date(date_format: str = '%Y'):
+    """Route to the shard named after the date the output xml was generated, e.g. '2024' or '2024-05'."""
+    return lambda key: key.generated_at.strftime(date_format) if key.generated_at else None
+
+
+_worker = threading.local()
+
+
+def _init_worker(db_url):
+    _worker.db_url = db_url
+    _worker.writer = None
+
+
+def _call_writer(function, *args):
+    if _worker.writer is None:
+        _worker.writer = DatabaseWriter(_worker.db_url)
+    return function(_worker.writer, *args)
+
+
+def _close_writer():
+    if _worker.writer is not None:
+        _worker.writer.close()
+
+
+class ShardRouter(object):
+
+    def __init__(
+        self,
+        shards: Dict[str, str],
+        rule: Optional[Callable[[RouteKey], Optional[str]]] = None,
+        *,
+        default: Optional[str] = None,
+        processes: bool = True,
+    ):
+        """Spreads imported runs over several databases.
+        router = ShardRouter({'a': uri_a, 'b': uri_b}, by_project(), default='a')
+
+        Each shard gets one DatabaseWriter, owned by a dedicated worker
+        process, so files routed to different shards are imported in parallel.
+        Functions given to submit() must therefore be picklable.
+
+        Args:
+            shards (dict): shard name -> connection string to dbbot database
+            rule (callable, optional): takes a RouteKey, returns a shard name. Defaults to always using `default`.
+            default (str, optional): shard used when the rule gives no known shard. Defaults to the only shard, if there is one.
+            processes (bool, optional): use a worker process per shard, or a worker thread when False. Defaults to True.
+        """
+        if default is None and len(shards) == 1:
+            default = next(iter(shards))
+        if default is not None and default not in shards:
+            raise ValueError('Default shard %s is not in the shard map' % default)
+        self._shards = dict(shards)
+        self._rule = rule
+        self._default = default
+        self._processes = processes
+        self._executors = {}
+
+    def __log(self, message):
+        logger.info(f"Shard Router {message}")
+
+    @property
+    def shards(self):
+        return dict(self._shards)
+
+    def route(self, xml_file, project=None):
+        key = RouteKey(project, os.path.abspath(xml_file))
+        shard = self._rule(key) if self._rule else None
+        if shard not in self._shards:
+            shard = self._default
+        if shard is None:
+            raise ValueError('No shard found for %s' % (key,))
+        self.__log('- Routing %s to shard %s' % (xml_file, shard))
+        return shard
+
+    def submit(self, shard, function, *args):
+        """Runs function(writer, *args) in the worker of the shard."""
+        if shard not in self._executors:
+            # The writer lives inside the worker, as connections may not be shared between threads.
+            executor = ProcessPoolExecutor if self._processes else ThreadPoolExecutor
+            self._executors[shard] = executor(max_workers=1, initializer=_init_worker,
+                                              initargs=(self._shards[shard],))
+        return self._executors[shard].submit(_call_writer, function, *args)
+
+    def close(self):
+        for executor in self._executors.values():
+            executor.submit(_close_writer)
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        self._executors.clear()
@@ -17,11 +17,12 @@ import sys
 
 sys.path.append(os.path.abspath(__file__ + '/../..'))
 from collections import namedtuple
+from typing import Optional, Sequence, Union
 
 from loguru import logger
 from robot.errors import DataError
 
-from dbbot.reader import DatabaseWriter, RobotResultsParser
+from dbbot.reader import DatabaseWriter, RobotResultsParser, ShardRouter
 
 
 class DbBot(object):
@@ -30,43 +31,65 @@ class DbBot(object):
 
     def __init__(
             self,
-            file_path: str,
+            file_path: Union[str, Sequence[str]],
             *,
-            database_url: str,
+            database_url: Optional[str] = None,
+            shards: Optional[ShardRouter] = None,
+            project: Optional[str] = None,
             include_keywords: bool = False,
             dry_run: bool = False,
         ):
             """This version of dbbot is only runnable from code.
             db_bot = DbBot(output_xml, database_url=uri, include_keywords=False)
+            db_bot = DbBot(output_xmls, shards=ShardRouter(shard_map, by_project()), project='team-a')
 
             Args:
-                file_path (str): Path to output xml
-                database_url (str): connection string to dbbot database
+                file_path (str or list): Path to output xml, or a list of them
+                database_url (str, optional): connection string to dbbot database
+                shards (ShardRouter, optional): routes each output xml to one of several databases, instead of database_url
+                project (str, optional): project name the output xmls belong to, used for routing. Defaults to None.
                 include_keywords (bool, optional): whether to pull keywords and their execution into database. Defaults to False.
                 dry_run (bool, optional): show what would happen but do not execute. Defaults to False.
                 be_verbose (bool, optional): much logging or not much. Defaults to True.
             """
+            if (database_url is None) == (shards is None):
+                raise ValueError('Exactly one of database_url and shards has to be given')
+            file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
             self._options = namedtuple(
                 "options",
-                ["dry_run", "include_keywords", "db_url", "file_paths"],
-            )(dry_run, include_keywords, database_url, [file_path])
-            self._db = DatabaseWriter(self._options.db_url)
-            self._parser = RobotResultsParser(
-                self._options.include_keywords, self._db
-            )
+                ["dry_run", "include_keywords", "db_url", "file_paths", "project"],
+            )(dry_run, include_keywords, database_url, file_paths, project)
+            self._shards = shards
+            self._db = DatabaseWriter(self._options.db_url) if shards is None else None
 
     def _resolve_db_url(self):
         return self.DRY_RUN_DB_URL if self._options.dry_run else self._options.db_url
 
     def run(self):
         try:
-            for xml_file in self._options.file_paths:
-                self._parser.xml_to_db(xml_file)
+            if self._shards is None:
+                for xml_file in self._options.file_paths:
+                    self._import(self._db, self._options.include_keywords, xml_file)
+            else:
+                self._run_sharded()
         except DataError as message:
             sys.stderr.write('dbbot: error: Invalid XML: %s\n\n' % message)
             exit(1)
         finally:
-            self._db.close()
+            (self._db or self._shards).close()
+
+    def _run_sharded(self):
+        imports = [
+            self._shards.submit(self._shards.route(xml_file, self._options.project),
+                                self._import, self._options.include_keywords, xml_file)
+            for xml_file in self._options.file_paths
+        ]
+        for result in imports:
+            result.result()
+
+    @staticmethod
+    def _import(db, include_keywords, xml_file):
+        RobotResultsParser(include_keywords, db).xml_to_db(xml_file)
 
 
 if __name__ == '__main__':
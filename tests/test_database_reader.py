@@ -0,0 +1,202 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dbbot.reader import DatabaseWriter, DbBotReader
+
+IMPORTED_AT = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return 'sqlite:///%s' % (tmp_path / 'robot_results.db')
+
+
+@pytest.fixture
+def writer(db_url):
+    db = DatabaseWriter(db_url)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def reader(db_url, writer):
+    db = DbBotReader(db_url)
+    yield db
+    db.close()
+
+
+def insert_run(db, number, passed=1, failed=0, imported_at=None):
+    test_run_id = db.insert('test_runs', {
+        'hash': 'hash-%d' % number,
+        'imported_at': imported_at or IMPORTED_AT + timedelta(minutes=number),
+        'source_file': 'output-%d.xml' % number,
+    })
+    db.insert('test_run_status', {'test_run_id': test_run_id, 'name': 'All Tests',
+                                  'passed': passed, 'failed': failed})
+    return test_run_id
+
+
+def insert_suite(db, test_run_id, name='Suite'):
+    return db.insert('suites', {'test_run_id': test_run_id, 'xml_id': 's1', 'name': name,
+                                'source': '%s.robot' % name})
+
+
+def insert_test(db, test_run_id, suite_id, name, status='PASS', elapsed=10):
+    test_id = db.insert('tests', {'suite_id': suite_id, 'xml_id': 's1-t1', 'name': name})
+    db.insert('test_status', {'test_run_id': test_run_id, 'test_id': test_id,
+                              'status': status, 'elapsed': elapsed})
+    return test_id
+
+
+def insert_keyword(db, test_run_id, suite_id, name, type='KEYWORD', elapsed=(1,), xml_id=None):
+    keyword_id = db.insert('keywords', {'suite_id': suite_id, 'keyword_xml_id': xml_id or name + type,
+                                        'name': name, 'type': type})
+    for value in elapsed:
+        db.insert('keyword_status', {'test_run_id': test_run_id, 'keyword_id': keyword_id,
+                                     'status': 'PASS', 'elapsed': value})
+    return keyword_id
+
+
+def insert_message(db, suite_id, keyword_id, content, level='FAIL'):
+    return db.insert('messages', {'suite_id': suite_id, 'keyword_id': keyword_id, 'level': level,
+                                  'timestamp': IMPORTED_AT, 'time_string': str(IMPORTED_AT),
+                                  'content': content, 'content_hash': content})
+
+
+def all_pages(query, *args, **kwargs):
+    pages = [query(*args, **kwargs)]
+    while pages[-1].next_key is not None:
+        pages.append(query(*args, after=pages[-1].next_key, **kwargs))
+    return pages
+
+
+def test_cache_is_invalidated_by_writes_finishing_an_import(writer, db_url):
+    reader = DbBotReader(db_url, cache_size=16)
+    test_run_id = writer.insert('test_runs', {'hash': 'partial', 'imported_at': IMPORTED_AT})
+    partial = reader.run_summaries().items[0]
+    assert (partial.passed, partial.failed) == (None, None)
+    writer.insert('test_run_status', {'test_run_id': test_run_id, 'name': 'All Tests', 'passed': 3, 'failed': 1})
+    complete = reader.run_summaries().items[0]
+    assert (complete.passed, complete.failed) == (3, 1)
+    reader.close()
+
+
+def test_cache_is_used_while_nothing_is_written(writer, db_url, monkeypatch):
+    insert_run(writer, 1)
+    reader = DbBotReader(db_url, cache_size=16)
+    executed = []
+    execute = reader._execute
+    monkeypatch.setattr(reader, '_execute', lambda *args: executed.append(args) or execute(*args))
+    assert reader.run_summaries() == reader.run_summaries()
+    assert len(executed) == 1
+    insert_run(writer, 2)
+    assert len(reader.run_summaries().items) == 2
+    assert len(executed) == 2
+    reader.close()
+
+
+def test_reader_connection_does_not_hold_a_transaction(writer, reader):
+    insert_run(writer, 1)
+    reader.run_summaries()
+    # pysqlite reports driver level autocommit as isolation_level None.
+    assert reader._connection.connection.isolation_level is None
+    insert_run(writer, 2)
+    assert len(reader.run_summaries().items) == 2
+
+
+def test_run_summaries_include_total_statistics(writer, reader):
+    insert_run(writer, 1, passed=4, failed=2)
+    run = reader.run_summaries().items[0]
+    assert (run.hash, run.source_file, run.passed, run.failed) == ('hash-1', 'output-1.xml', 4, 2)
+
+
+def test_run_summaries_are_paginated_newest_first(writer, reader):
+    ids = [insert_run(writer, number) for number in range(5)]
+    pages = all_pages(reader.run_summaries, limit=2)
+    assert [[run.id for run in page.items] for page in pages] == [ids[4:2:-1], ids[2:0:-1], ids[:1]]
+    assert pages[-1].next_key is None
+
+
+def test_run_summaries_are_ordered_by_import_time_not_id(writer, reader):
+    late = insert_run(writer, 1, imported_at=IMPORTED_AT + timedelta(hours=1))
+    early = insert_run(writer, 2, imported_at=IMPORTED_AT)
+    tied = [insert_run(writer, number, imported_at=IMPORTED_AT + timedelta(minutes=30)) for number in (3, 4)]
+    pages = all_pages(reader.run_summaries, limit=1)
+    assert [run.id for page in pages for run in page.items] == [late, tied[1], tied[0], early]
+    assert pages[0].next_key == (IMPORTED_AT + timedelta(hours=1), late)
+
+
+def test_full_last_page_is_followed_by_an_empty_page(writer, reader):
+    for number in range(4):
+        insert_run(writer, number)
+    pages = all_pages(reader.run_summaries, limit=2)
+    assert [len(page.items) for page in pages] == [2, 2, 0]
+
+
+@pytest.mark.parametrize('query, args', [('run_summaries', ()), ('test_history', ('Login',)),
+                                         ('failure_messages', (1,)), ('keyword_timings', (1,))])
+@pytest.mark.parametrize('limit', [0, -1])
+def test_page_limit_has_to_be_positive(reader, query, args, limit):
+    with pytest.raises(ValueError, match='at least 1'):
+        getattr(reader, query)(*args, limit=limit)
+
+
+def test_test_history_covers_all_runs(writer, reader):
+    for number in range(3):
+        test_run_id = insert_run(writer, number)
+        insert_test(writer, test_run_id, insert_suite(writer, test_run_id), 'Login', status='FAIL' if number else 'PASS')
+        insert_test(writer, test_run_id, insert_suite(writer, test_run_id, 'Other'), 'Logout')
+    pages = all_pages(reader.test_history, 'Login', limit=2)
+    history = [entry for page in pages for entry in page.items]
+    assert [entry.status for entry in history] == ['FAIL', 'FAIL', 'PASS']
+    assert [entry.test_run_id for entry in history] == [3, 2, 1]
+    assert {entry.test_name for entry in history} == {'Login'}
+
+
+def test_test_history_filtered_by_suite(writer, reader):
+    test_run_id = insert_run(writer, 1)
+    insert_test(writer, test_run_id, insert_suite(writer, test_run_id, 'Web'), 'Login')
+    insert_test(writer, test_run_id, insert_suite(writer, test_run_id, 'Api'), 'Login')
+    history = reader.test_history('Login', suite_name='Api').items
+    assert [entry.suite_name for entry in history] == ['Api']
+    assert len(reader.test_history('Login').items) == 2
+
+
+def test_failure_messages_of_a_run(writer, reader):
+    test_run_id = insert_run(writer, 1)
+    suite_id = insert_suite(writer, test_run_id)
+    keyword_id = insert_keyword(writer, test_run_id, suite_id, 'Fail')
+    for content in ('first', 'second', 'third'):
+        insert_message(writer, suite_id, keyword_id, content)
+    insert_message(writer, suite_id, keyword_id, 'just info', level='INFO')
+    other_run_id = insert_run(writer, 2)
+    other_suite_id = insert_suite(writer, other_run_id)
+    insert_message(writer, other_suite_id, insert_keyword(writer, other_run_id, other_suite_id, 'Fail'), 'other')
+    pages = all_pages(reader.failure_messages, test_run_id, limit=2)
+    assert [[message.content for message in page.items] for page in pages] == [['first', 'second'], ['third']]
+
+
+def test_keyword_timings_aggregate_by_name_and_type(writer, reader):
+    test_run_id = insert_run(writer, 1)
+    suite_id = insert_suite(writer, test_run_id)
+    insert_keyword(writer, test_run_id, suite_id, 'Log', elapsed=(2, 5), xml_id='k1')
+    insert_keyword(writer, test_run_id, suite_id, 'Log', elapsed=(3,), xml_id='k2')
+    timing = reader.keyword_timings(test_run_id).items[0]
+    assert timing == ('Log', 'KEYWORD', 3, 10, 5)
+    assert timing.average_elapsed == pytest.approx(10 / 3)
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_keyword_timings_keyset_breaks_ties_by_name_and_type(writer, reader, limit):
+    test_run_id = insert_run(writer, 1)
+    suite_id = insert_suite(writer, test_run_id)
+    for name, type, elapsed in [('B', 'SETUP', 10), ('A', 'TEARDOWN', 5), ('C', 'KEYWORD', 20),
+                                ('B', 'KEYWORD', 10), ('A', 'KEYWORD', 10)]:
+        insert_keyword(writer, test_run_id, suite_id, name, type, elapsed=(elapsed,))
+    pages = all_pages(reader.keyword_timings, test_run_id, limit=limit)
+    assert all(len(page.items) <= limit for page in pages)
+    assert [(timing.name, timing.type) for page in pages for timing in page.items] == [
+        ('C', 'KEYWORD'), ('A', 'KEYWORD'), ('B', 'KEYWORD'), ('B', 'SETUP'), ('A', 'TEARDOWN')
+    ]
+    assert pages[0].next_key == [(20, 'C', 'KEYWORD'), (10, 'A', 'KEYWORD'), (10, 'B', 'KEYWORD')][limit - 1]
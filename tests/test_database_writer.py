@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from dbbot.reader import DatabaseWriter
+
+INDEXES = {'ix_test_runs_imported_at_id', 'ix_tests_name', 'ix_test_status_test_id',
+           'ix_keyword_status_test_run_id_keyword_id'}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'robot_results.db'
+
+
+def index_names(db_path):
+    connection = sqlite3.connect(str(db_path))
+    try:
+        return {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        connection.close()
+
+
+def test_indexes_are_created_with_the_schema(db_path):
+    DatabaseWriter('sqlite:///%s' % db_path).close()
+    assert INDEXES <= index_names(db_path)
+
+
+def test_missing_indexes_are_added_to_an_existing_database(db_path):
+    DatabaseWriter('sqlite:///%s' % db_path).close()
+    connection = sqlite3.connect(str(db_path))
+    for name in INDEXES:
+        connection.execute('DROP INDEX %s' % name)
+    connection.commit()
+    connection.close()
+    assert not INDEXES & index_names(db_path)
+    DatabaseWriter('sqlite:///%s' % db_path).close()
+    assert INDEXES <= index_names(db_path)
@@ -0,0 +1,201 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+import robot
+from robot.errors import DataError
+
+from dbbot import DbBot, DbBotReader, ShardedDbBotReader, ShardRouter, by_date, by_project, by_source
+from dbbot.reader import DatabaseWriter
+
+IMPORTED_AT = datetime(2024, 1, 1, 12, 0, 0)
+SUITE = """*** Test Cases ***
+Passing
+    Log    hello
+Failing
+    Fail    boom
+"""
+
+
+@pytest.fixture(scope='module')
+def output_xml(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('robot')
+    suite = directory / 'suite.robot'
+    suite.write_text(SUITE)
+    output = directory / 'output.xml'
+    robot.run(str(suite), output=str(output), log=None, report=None, stdout=StringIO(), stderr=StringIO())
+    return output
+
+
+@pytest.fixture
+def output_xmls(output_xml, tmp_path):
+    # The content differs per copy, so each file is imported as its own run.
+    paths = []
+    for name in ('team-a-1.xml', 'team-b-1.xml', 'team-a-2.xml'):
+        path = tmp_path / name
+        path.write_text(output_xml.read_text() + '<!-- %s -->' % name)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def shards(tmp_path):
+    return {name: 'sqlite:///%s' % (tmp_path / ('%s.db' % name)) for name in ('a', 'b', 'c')}
+
+
+def xml_generated_at(tmp_path, generated):
+    path = tmp_path / ('generated-%s.xml' % generated.replace(':', '').replace(' ', '_'))
+    path.write_text('<robot generated="%s"><suite name="S"/></robot>' % generated)
+    return str(path)
+
+
+def sqlite_path(db_url):
+    return db_url[len('sqlite:///'):]
+
+
+def run_count(db_url):
+    if not os.path.exists(sqlite_path(db_url)):
+        return 0
+    reader = DbBotReader(db_url)
+    try:
+        return len(reader.run_summaries(limit=100).items)
+    finally:
+        reader.close()
+
+
+def insert_runs(db_url, imported_at):
+    db = DatabaseWriter(db_url)
+    for index, moment in enumerate(imported_at):
+        db.insert('test_runs', {'hash': '%s-%d' % (db_url, index), 'imported_at': moment})
+    db.close()
+
+
+def raise_error(db, message):
+    raise RuntimeError(message)
+
+
+def test_route_by_project(shards):
+    router = ShardRouter(shards, by_project(), default='c')
+    assert router.route('missing.xml', project='a') == 'a'
+    assert router.route('missing.xml', project='unknown') == 'c'
+    mapped = ShardRouter(shards, by_project({'team-b': 'b'}), default='c')
+    assert mapped.route('missing.xml', project='team-b') == 'b'
+    assert mapped.route('missing.xml') == 'c'
+
+
+def test_route_by_source(shards, tmp_path):
+    router = ShardRouter(shards, by_source({'*/team-a-*.xml': 'a', '*/team-b-*': 'b'}), default='c')
+    assert router.route(str(tmp_path / 'team-a-7.xml')) == 'a'
+    assert router.route(str(tmp_path / 'team-b-7.xml')) == 'b'
+    assert router.route(str(tmp_path / 'other.xml')) == 'c'
+
+
+def test_route_by_date(tmp_path):
+    router = ShardRouter({'2023': 'sqlite://', '2024-05': 'sqlite://', 'old': 'sqlite://'},
+                         by_date(), default='old')
+    assert router.route(xml_generated_at(tmp_path, '20230105 10:00:00.000')) == '2023'
+    assert router.route(xml_generated_at(tmp_path, '2023-06-01T10:00:00.000000')) == '2023'
+    assert router.route(xml_generated_at(tmp_path, '20210105 10:00:00.000')) == 'old'
+    monthly = ShardRouter({'2024-05': 'sqlite://'}, by_date('%Y-%m'))
+    assert monthly.route(xml_generated_at(tmp_path, '20240517 08:00:00.000')) == '2024-05'
+
+
+def test_route_without_default_fails_for_unmatched_files(shards):
+    router = ShardRouter(shards, by_project())
+    with pytest.raises(ValueError, match='No shard found'):
+        router.route('missing.xml', project='unknown')
+
+
+def test_default_must_be_a_known_shard(shards):
+    with pytest.raises(ValueError, match='not in the shard map'):
+        ShardRouter(shards, default='unknown')
+
+
+def test_route_reads_output_xml_only_when_the_rule_needs_it(shards, tmp_path):
+    assert ShardRouter(shards, by_project(), default='a').route(str(tmp_path / 'missing.xml')) == 'a'
+    with pytest.raises(DataError, match='missing.xml'):
+        ShardRouter(shards, by_date(), default='a').route(str(tmp_path / 'missing.xml'))
+    garbage = tmp_path / 'garbage.xml'
+    garbage.write_text('garbage')
+    with pytest.raises(DataError, match='garbage.xml'):
+        ShardRouter(shards, by_date(), default='a').route(str(garbage))
+
+
+@pytest.mark.parametrize('processes', [True, False])
+def test_runs_are_written_to_their_shards(shards, output_xmls, processes):
+    router = ShardRouter(shards, by_source({'*/team-a-*': 'a', '*/team-b-*': 'b'}), processes=processes)
+    DbBot(output_xmls, shards=router).run()
+    assert [run_count(shards[name]) for name in ('a', 'b', 'c')] == [2, 1, 0]
+
+
+def test_runs_are_written_to_the_shard_of_their_project(shards, output_xmls):
+    DbBot(output_xmls, shards=ShardRouter(shards, by_project()), project='b').run()
+    assert [run_count(shards[name]) for name in ('a', 'b', 'c')] == [0, 3, 0]
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_run_summaries_are_merged_over_shards(shards, limit):
+    # Shard a is imported with a clock going backwards, nothing is imported to shard c.
+    insert_runs(shards['a'], [IMPORTED_AT + timedelta(minutes=minutes) for minutes in (50, 10, 40, 20, 30)])
+    insert_runs(shards['b'], [IMPORTED_AT + timedelta(minutes=25)])
+    reader = ShardedDbBotReader(shards)
+    pages = [reader.run_summaries(limit)]
+    while pages[-1].next_key is not None:
+        pages.append(reader.run_summaries(limit, after=pages[-1].next_key))
+    merged = [(item.shard, item.record.imported_at) for page in pages for item in page.items]
+    assert [moment.minute for _, moment in merged] == [50, 40, 30, 25, 20, 10]
+    assert [shard for shard, _ in merged].count('b') == 1
+    assert all(len(page.items) <= limit for page in pages)
+    assert not os.path.exists(sqlite_path(shards['c']))
+    reader.close()
+
+
+def test_shards_without_imports_are_read_as_empty(shards):
+    sqlite3.connect(sqlite_path(shards['b'])).close()
+    reader = ShardedDbBotReader(shards)
+    assert reader.run_summaries() == ([], None)
+    with pytest.raises(ValueError, match='Shard a has no DbBot results yet'):
+        reader.reader('a')
+    assert not os.path.exists(sqlite_path(shards['a']))
+    insert_runs(shards['a'], [IMPORTED_AT])
+    assert [item.shard for item in reader.run_summaries().items] == ['a']
+    reader.close()
+
+
+def test_run_summaries_reject_unknown_shards_in_after(shards):
+    reader = ShardedDbBotReader(shards)
+    with pytest.raises(ValueError, match='Unknown shards in after: x'):
+        reader.run_summaries(after={'a': None, 'x': None})
+    reader.close()
+
+
+def test_worker_errors_are_raised_to_the_caller(shards):
+    router = ShardRouter(shards, default='a')
+    try:
+        with pytest.raises(RuntimeError, match='from worker'):
+            router.submit('a', raise_error, 'from worker').result()
+    finally:
+        router.close()
+
+
+def test_invalid_xml_in_a_shard_worker_exits_with_error(shards, tmp_path, capsys):
+    broken = tmp_path / 'broken.xml'
+    broken.write_text('<robot generated="20240101 10:00:00.000"><suite name="S"><bad')
+    with pytest.raises(SystemExit) as exit:
+        DbBot([str(broken)], shards=ShardRouter(shards, default='a')).run()
+    assert exit.value.code == 1
+    assert 'dbbot: error: Invalid XML' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('content', [None, 'garbage'])
+def test_unreadable_xml_exits_with_error(shards, tmp_path, capsys, content):
+    path = tmp_path / 'output.xml'
+    if content is not None:
+        path.write_text(content)
+    for db in (dict(database_url=shards['a']), dict(shards=ShardRouter(shards, by_date(), default='a'))):
+        with pytest.raises(SystemExit) as exit:
+            DbBot(str(path), **db).run()
+        assert exit.value.code == 1
+        assert 'dbbot: error: Invalid XML' in capsys.readouterr().err